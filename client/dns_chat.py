@@ -1,31 +1,101 @@
 #!/usr/bin/env python3
 
-import dns.resolver
-import dns.exception
+from __future__ import annotations
+
+# dnspython, asyncio and prompt_toolkit are imported where they are used, so
+# commands that never need them (--help) do not pay for loading them.
+import io
+import socket
 import sys
 import os
+import re
 import time
 import threading
-from typing import Optional, List
+from typing import TYPE_CHECKING, Dict, Optional, List, Tuple, Union
 import click
 from colorama import init, Fore, Style, Back
-from prompt_toolkit import prompt
-from prompt_toolkit.history import InMemoryHistory
-from prompt_toolkit.styles import Style as PromptStyle
 
-init()
+if TYPE_CHECKING:
+    import dns.message
+    import dns.name
+
+_colors_initialized = False
+
+def _init_colors():
+    # Only wrap stdout when colorama has work to do: stripping escapes from
+    # piped output, or converting them for Windows consoles. A POSIX terminal
+    # gets the raw stream.
+    global _colors_initialized
+    if _colors_initialized:
+        return
+    stdout_is_tty = sys.stdout.isatty()
+    init(strip=not stdout_is_tty, convert=sys.platform == "win32" and stdout_is_tty)
+    _colors_initialized = True
+
+# Queries whose answers may be served from the client cache, mapped to the
+# minimum number of seconds to keep them. Chat queries carry the API key and
+# are never cached.
+_CACHEABLE_QUERIES = {"PING": 0, "LIST": 60}
+
+_MODELS_PREFIX = "Available models: "
+_MODELS_PREFIX_LEN = len(_MODELS_PREFIX)
+_MODEL_SEPARATOR = re.compile(r"\s*\|\s*")
+
+_SPINNER = ("⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏")
+_SPINNER_LEN = len(_SPINNER)
+
+_EXIT = frozenset({'quit', 'exit', 'bye', 'q'})
+
+_LOOPBACK_HOSTS = frozenset({'127.0.0.1', '::1', 'localhost'})
+
+# EDNS0 UDP payload size advertised to the server, so answers larger than
+# 512 bytes still fit in one datagram. 1232 is the DNS Flag Day 2020 value
+# that avoids IP fragmentation on common paths.
+_EDNS_PAYLOAD = 1232
+
+# Per-attempt timeout of the first UDP try; each retry waits twice as long,
+# up to --timeout, until --lifetime runs out
+_FIRST_ATTEMPT_TIMEOUT = 0.5
+
+# How queries reach the server. "auto" sends PING/LIST over UDP and chat
+# turns over a persistent TCP connection; the others carry every query.
+_TRANSPORTS = ("auto", "udp", "tcp", "tls", "https")
+_DEFAULT_PORTS = {"auto": 53, "udp": 53, "tcp": 53, "tls": 853, "https": 443}
+
+# Seconds a server address that timed out or refused a connection is tried
+# only after the host's other addresses
+_FAILED_ADDRESS_PENALTY = 30
+
+# A DNS name is at most 255 bytes on the wire: every label costs one length
+# byte and the root label one more, so 250 bytes of text fit in 4 labels.
+_MAX_LABEL_BYTES = 63
+_MAX_QUERY_BYTES = 250
+
+def _query_name(query: Union[str, bytes]) -> dns.name.Name:
+    import dns.name
+    
+    # Queries are raw text, not zone-file syntax: dots, spaces and backslashes
+    # in a prompt are sent as-is instead of being parsed as label separators.
+    raw = query if isinstance(query, bytes) else query.encode("utf-8")
+    labels = [raw[i:i + _MAX_LABEL_BYTES] for i in range(0, len(raw), _MAX_LABEL_BYTES)]
+    return dns.name.Name(labels + [b""])
 
 class LoadingAnimation:
-    def __init__(self, message: str = "Loading"):
+    def __init__(self, message: str = "Loading", enabled: bool = True):
         self.message = message
-        self.animation_chars = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
+        self.enabled = enabled
         self.running = False
         self.thread = None
+        self._stopped = threading.Event()
         
     def start(self):
-        if self.running:
+        if self.running or not self.enabled:
+            return
+        # Nobody is watching a spinner in pipes, logs or NO_COLOR terminals
+        if not sys.stdout.isatty() or os.environ.get("NO_COLOR"):
             return
         self.running = True
+        self._stopped.clear()
         self.thread = threading.Thread(target=self._animate)
         self.thread.daemon = True
         self.thread.start()
@@ -34,6 +104,7 @@ class LoadingAnimation:
         if not self.running:
             return
         self.running = False
+        self._stopped.set()
         if self.thread:
             self.thread.join()
         print(f"\r{' ' * (len(self.message) + 10)}\r", end="", flush=True)
@@ -41,68 +112,454 @@ class LoadingAnimation:
     def _animate(self):
         i = 0
         while self.running:
-            char = self.animation_chars[i % len(self.animation_chars)]
+            char = _SPINNER[i % _SPINNER_LEN]
             print(f"\r{Fore.CYAN}{char} {self.message}{Style.RESET_ALL}", end="", flush=True)
-            time.sleep(0.1)
+            # Wakes as soon as stop() is called instead of finishing the tick
+            self._stopped.wait(0.1)
             i += 1
 
 class DNSChatClient:
-    def __init__(self, server_host: str = "127.0.0.1", server_port: int = 53):
+    def __init__(self, server_host: str = "127.0.0.1", server_port: int = 53, timeout: float = 2.0, lifetime: float = 6.0, spinner: bool = True,
+                 transport: str = "auto", server_name: Optional[str] = None, chat_timeout: float = 10.0):
+        import dns.message
+        import dns.rdatatype
+        
+        _init_colors()
+        
         self.server_host = server_host
         self.server_port = server_port
         self.api_key = ""
+        self._api_key_prefix = b""
+        self.spinner = spinner
+        self.transport = transport
+        # Name checked against the server's certificate for tls and https
+        self.server_name = server_name or server_host
+        
+        # timeout bounds a single attempt against the server, lifetime bounds
+        # the whole query including retries of lost UDP packets. Chat turns
+        # are never retried and wait chat_timeout for the model to answer.
+        self.timeout = timeout
+        self.lifetime = lifetime
+        self.chat_timeout = chat_timeout
+        
+        self._cache: Dict[str, Tuple[float, str]] = {}
         
-        self.resolver = dns.resolver.Resolver()
-        self.resolver.nameservers = [server_host]
-        self.resolver.port = server_port
-        self.resolver.timeout = 10
-        self.resolver.lifetime = 10
+        # Status lines are written as pre-encoded bytes in a single write
+        self._encoding = sys.stdout.encoding or "utf-8"
+        self._SUCCESS = f"{Fore.GREEN}✓ ".encode(self._encoding, "replace")
+        self._ERROR = f"{Fore.RED}✗ ".encode(self._encoding, "replace")
+        self._INFO = f"{Fore.BLUE}ℹ ".encode(self._encoding, "replace")
+        self._WARNING = f"{Fore.YELLOW}⚠ ".encode(self._encoding, "replace")
+        self._RESPONSE = f"{Fore.CYAN}{Back.BLACK}AI Response{Style.RESET_ALL}{Fore.CYAN}: ".encode(self._encoding, "replace")
+        self._RESET = f"{Style.RESET_ALL}\n".encode(self._encoding, "replace")
+        self._RESET_BLANK = f"{Style.RESET_ALL}\n\n".encode(self._encoding, "replace")
+        
+        # server_host may be a name with several addresses; it is resolved on
+        # first use and addresses that fail are skipped for a while.
+        self._addresses: Optional[List[Tuple[int, str]]] = None
+        self._failed_until: Dict[str, float] = {}
+        
+        # Reused for every query: one UDP socket per address family and one
+        # query message whose question is swapped per call, instead of a full
+        # resolver round per turn.
+        self._udp_socks: Dict[int, socket.socket] = {}
+        self._query = dns.message.make_query("PING", dns.rdatatype.TXT, use_edns=0, payload=_EDNS_PAYLOAD)
+        
+        # Chat turns go over one TCP (or TLS) connection kept open for the
+        # whole session, opened on first use and re-opened if the server drops
+        # it. DNS-over-HTTPS likewise keeps one HTTP/2 client.
+        self._tcp_sock: Optional[socket.socket] = None
+        self._https_session = None
+        
+        # The shared query message, sockets and connection serve one query at
+        # a time; threads sharing a client wait for each other's turn.
+        self._lock = threading.Lock()
+    
+    def close(self):
+        with self._lock:
+            if self._tcp_sock is not None:
+                self._tcp_sock.close()
+                self._tcp_sock = None
+        if self._https_session is not None:
+            self._https_session.close()
+            self._https_session = None
+        for sock in self._udp_socks.values():
+            sock.close()
+        self._udp_socks.clear()
     
     def set_api_key(self, api_key: str) -> bool:
         if len(api_key) != 10:
             self.print_error(f"API key must be exactly 10 characters. Got {len(api_key)} characters.")
             return False
         self.api_key = api_key
+        self._api_key_prefix = api_key.encode("utf-8")
         return True
     
+    def _write_line(self, prefix: bytes, message: str, suffix: Optional[bytes] = None):
+        out = sys.stdout
+        line = prefix + message.encode(self._encoding, "replace") + (suffix or self._RESET)
+        # colorama swaps in its own wrapper when escapes must be stripped or
+        # converted; only a plain stdout can take the bytes directly.
+        if type(out) is io.TextIOWrapper:
+            out.flush()
+            out.buffer.write(line)
+            out.buffer.flush()
+        else:
+            out.write(line.decode(self._encoding, "replace"))
+    
     def print_success(self, message: str):
-        print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+        self._write_line(self._SUCCESS, message)
     
     def print_error(self, message: str):
-        print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}")
+        self._write_line(self._ERROR, message)
     
     def print_info(self, message: str):
-        print(f"{Fore.BLUE}ℹ {message}{Style.RESET_ALL}")
+        self._write_line(self._INFO, message)
     
     def print_warning(self, message: str):
-        print(f"{Fore.YELLOW}⚠ {message}{Style.RESET_ALL}")
+        self._write_line(self._WARNING, message)
     
     def print_response(self, message: str):
-        print(f"{Fore.CYAN}{Back.BLACK}AI Response{Style.RESET_ALL}", end="")
-        print(f"{Fore.CYAN}: {message}{Style.RESET_ALL}")
-        print()
+        self._write_line(self._RESPONSE, message, self._RESET_BLANK)
+    
+    def _server_addresses(self) -> List[Tuple[int, str]]:
+        if self._addresses is None:
+            addresses: List[Tuple[int, str]] = []
+            for family, _, _, _, sockaddr in socket.getaddrinfo(self.server_host, self.server_port, type=socket.SOCK_DGRAM):
+                if (family, sockaddr[0]) not in addresses:
+                    addresses.append((family, sockaddr[0]))
+            self._addresses = addresses
+        
+        # Stable sort: healthy addresses keep the system's preferred order and
+        # recently failed ones go last instead of being retried first.
+        now = time.monotonic()
+        return sorted(self._addresses, key=lambda address: self._failed_until.get(address[1], 0.0) > now)
+    
+    def _mark_failed(self, address: str):
+        self._failed_until[address] = time.monotonic() + _FAILED_ADDRESS_PENALTY
+    
+    def _udp_sock(self, family: int, drain: bool) -> socket.socket:
+        sock = self._udp_socks.get(family)
+        if sock is None:
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+            self._udp_socks[family] = sock
+            return sock
+        
+        # Drop late replies to earlier, timed out queries so they are not
+        # read as the answer to this one.
+        while drain:
+            try:
+                sock.recv(65535)
+            except BlockingIOError:
+                break
+        return sock
+    
+    def _connect_tcp(self) -> socket.socket:
+        import ssl
+        
+        error: Optional[OSError] = None
+        for family, address in self._server_addresses():
+            try:
+                sock = socket.create_connection((address, self.server_port), timeout=self.timeout)
+                if self.transport == "tls":
+                    sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.server_name)
+            except ssl.SSLCertVerificationError:
+                # The address is up, its certificate just does not match;
+                # the host's other addresses would fail the same check.
+                raise
+            except OSError as e:
+                self._mark_failed(address)
+                error = e
+                continue
+            sock.setblocking(False)
+            return sock
+        raise error
+    
+    def _exchange_tcp(self, query: dns.message.Message, timeout: float) -> dns.message.Message:
+        import dns.query
+        
+        reconnected = self._tcp_sock is None
+        while True:
+            if self._tcp_sock is None:
+                self._tcp_sock = self._connect_tcp()
+            try:
+                return dns.query.tcp(
+                    query,
+                    self._tcp_sock.getpeername()[0],
+                    port=self.server_port,
+                    timeout=timeout,
+                    sock=self._tcp_sock,
+                )
+            except (ConnectionError, EOFError):
+                self._tcp_sock.close()
+                self._tcp_sock = None
+                if reconnected:
+                    raise
+                reconnected = True
+            except BaseException:
+                # A half-read reply would desync the stream for the next query
+                self._tcp_sock.close()
+                self._tcp_sock = None
+                raise
+    
+    @staticmethod
+    def _is_cert_error(error: Optional[BaseException]) -> bool:
+        import ssl
+        
+        # httpx wraps the ssl error in its own ConnectError
+        while error is not None:
+            if isinstance(error, ssl.SSLCertVerificationError):
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+    
+    def _https_request(self, query: dns.message.Message, address: str, timeout: float) -> Dict[str, object]:
+        # Like tls, https connects to the --host address and uses server_name
+        # only for SNI, certificate checking and the Host header, so a name that
+        # system DNS cannot resolve still works.
+        host = f"[{address}]" if ":" in address else address
+        authority = self.server_name if self.server_port == 443 else f"{self.server_name}:{self.server_port}"
+        return {
+            "url": f"https://{host}:{self.server_port}/dns-query",
+            "content": query.to_wire(),
+            "headers": {
+                "host": authority,
+                "accept": "application/dns-message",
+                "content-type": "application/dns-message",
+            },
+            "extensions": {"sni_hostname": self.server_name},
+            "timeout": timeout,
+        }
     
-    def query_dns(self, query: str, show_query: bool = True, loading_message: str = "Querying DNS") -> Optional[str]:
-        if query == "PING":
+    @staticmethod
+    def _https_answer(query: dns.message.Message, reply) -> dns.message.Message:
+        import dns.message
+        import dns.query
+        
+        if not 200 <= reply.status_code <= 299:
+            raise ValueError(f"DNS-over-HTTPS server responded with status code {reply.status_code}")
+        response = dns.message.from_wire(reply.content)
+        if not query.is_response(response):
+            raise dns.query.BadResponse
+        return response
+    
+    @staticmethod
+    def _import_httpx():
+        import importlib.util
+        
+        # httpx imports h2 itself once http2=True; only check it is installed
+        if importlib.util.find_spec("httpx") is None or importlib.util.find_spec("h2") is None:
+            raise RuntimeError("DNS-over-HTTPS needs httpx with HTTP/2 support: pip install 'httpx[http2]'")
+        import httpx
+        return httpx
+    
+    def _exchange_https(self, query: dns.message.Message, timeout: float) -> dns.message.Message:
+        import dns.exception
+        
+        httpx = self._import_httpx()
+        if self._https_session is None:
+            self._https_session = httpx.Client(http2=True)
+        
+        error: Optional[Exception] = None
+        for _, address in self._server_addresses():
+            try:
+                reply = self._https_session.post(**self._https_request(query, address, timeout))
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if self._is_cert_error(e):
+                    raise
+                # Nothing was sent yet, so the next address can take the query
+                self._mark_failed(address)
+                error = e
+                continue
+            except httpx.TimeoutException:
+                raise dns.exception.Timeout() from None
+            return self._https_answer(query, reply)
+        raise error
+    
+    def _exchange_udp(self, query: dns.message.Message, resend: bool = True) -> dns.message.Message:
+        import dns.exception
+        import dns.query
+        
+        if not resend:
+            # Chat prompts are sent once and wait the whole chat_timeout: a resend
+            # would make the server generate (and pay for) the answer again, and
+            # a slow answer says nothing about the address being down.
+            family, address = self._server_addresses()[0]
+            return dns.query.udp(
+                query,
+                address,
+                port=self.server_port,
+                timeout=self.chat_timeout,
+                ignore_unexpected=True,
+                sock=self._udp_sock(family, drain=True),
+            )
+        
+        # A lost datagram is retried after 0.5s, 1s, 2s, ... rather than after a
+        # full --timeout. Replies to an earlier attempt carry the same id and are
+        # still accepted, so sockets are only drained before the first one.
+        deadline = time.monotonic() + self.lifetime
+        attempt_timeout = min(_FIRST_ATTEMPT_TIMEOUT, self.timeout)
+        drained = set()
+        attempts: List[str] = []
+        while True:
+            family, address = self._server_addresses()[0]
+            wait = max(0.0, min(attempt_timeout, deadline - time.monotonic()))
+            try:
+                return dns.query.udp(
+                    query,
+                    address,
+                    port=self.server_port,
+                    timeout=wait,
+                    ignore_unexpected=True,
+                    sock=self._udp_sock(family, drain=family not in drained),
+                )
+            except dns.exception.Timeout:
+                attempts.append(f"{address} after {wait:.1f}s")
+                # A short early attempt missing its reply is just a lost
+                # packet; only an address that sat out a full --timeout is
+                # moved behind the others.
+                if wait >= self.timeout:
+                    self._mark_failed(address)
+                if time.monotonic() >= deadline:
+                    raise dns.exception.Timeout(
+                        f"DNS query timed out ({len(attempts)} attempts: {', '.join(attempts)})"
+                    ) from None
+                attempt_timeout = min(attempt_timeout * 2, self.timeout)
+            finally:
+                drained.add(family)
+    
+    @staticmethod
+    def _answer_txt(response: dns.message.Message) -> str:
+        import dns.rcode
+        import dns.resolver
+        
+        if response.rcode() == dns.rcode.NXDOMAIN:
+            raise dns.resolver.NXDOMAIN()
+        if not response.answer:
+            raise dns.resolver.NoAnswer()
+        # Long TXT records arrive split into several <=255-byte strings
+        return b"".join(response.answer[0][0].strings).decode('utf-8', 'replace')
+    
+    def _resolve_txt(self, query: Union[str, bytes], use_tcp: bool = False) -> str:
+        import dns.entropy
+        
+        transport = self.transport
+        if transport == "auto":
+            transport = "tcp" if use_tcp else "udp"
+        timeout = self.lifetime if isinstance(query, str) else self.chat_timeout
+        
+        with self._lock:
+            # Only the id and the question name change between queries; the
+            # message, its flags and its question RRset are built once.
+            self._query.id = dns.entropy.random_16()
+            self._query.question[0].name = _query_name(query)
+            
+            if transport == "udp":
+                response = self._exchange_udp(self._query, resend=isinstance(query, str))
+            elif transport == "https":
+                response = self._exchange_https(self._query, timeout)
+            else:
+                response = self._exchange_tcp(self._query, timeout)
+        txt_record = self._answer_txt(response)
+        
+        if isinstance(query, str) and query in _CACHEABLE_QUERIES:
+            ttl = max(response.answer[0].ttl, _CACHEABLE_QUERIES[query])
+            if ttl > 0:
+                self._cache[query] = (time.monotonic() + ttl, txt_record)
+        return txt_record
+    
+    async def _gather_txt(self, queries: List[bytes], concurrency: int) -> List[object]:
+        import asyncio
+        import dns.asyncquery
+        import dns.exception
+        import dns.message
+        import dns.rdatatype
+        
+        # Each query gets its own message and connection so they can be in
+        # flight together; gather() keeps results in the order of the queries.
+        # Over https they share one HTTP/2 client and are multiplexed instead.
+        semaphore = asyncio.Semaphore(concurrency)
+        https_client = None
+        # Only errors raised before the prompt left move on to the next
+        # address; a timeout may mean the server is still answering it.
+        connect_errors: Tuple[type, ...] = (ConnectionRefusedError,)
+        if self.transport == "https":
+            httpx = self._import_httpx()
+            https_client = httpx.AsyncClient(http2=True)
+            connect_errors += (httpx.ConnectError, httpx.ConnectTimeout)
+        
+        async def exchange(message: dns.message.Message, address: str) -> dns.message.Message:
+            if https_client is not None:
+                try:
+                    reply = await https_client.post(**self._https_request(message, address, self.chat_timeout))
+                except httpx.TimeoutException as e:
+                    if isinstance(e, httpx.ConnectTimeout):
+                        raise
+                    raise dns.exception.Timeout() from None
+                return self._https_answer(message, reply)
+            if self.transport == "udp":
+                return await dns.asyncquery.udp(message, address, port=self.server_port, timeout=self.chat_timeout)
+            if self.transport == "tls":
+                return await dns.asyncquery.tls(
+                    message, address, port=self.server_port, timeout=self.chat_timeout, server_hostname=self.server_name
+                )
+            return await dns.asyncquery.tcp(message, address, port=self.server_port, timeout=self.chat_timeout)
+        
+        async def resolve(query: bytes) -> str:
+            message = dns.message.make_query(_query_name(query), dns.rdatatype.TXT, use_edns=0, payload=_EDNS_PAYLOAD)
+            error: Optional[Exception] = None
+            async with semaphore:
+                for _, address in self._server_addresses():
+                    try:
+                        response = await exchange(message, address)
+                    except connect_errors as e:
+                        if self._is_cert_error(e):
+                            raise
+                        self._mark_failed(address)
+                        error = e
+                        continue
+                    return self._answer_txt(response)
+            raise error
+        
+        try:
+            return await asyncio.gather(*(resolve(query) for query in queries), return_exceptions=True)
+        finally:
+            if https_client is not None:
+                await https_client.aclose()
+    
+    def query_dns(self, query: Union[str, bytes], show_query: bool = True, loading_message: str = "Querying DNS", use_tcp: bool = False) -> Optional[str]:
+        import dns.exception
+        import dns.resolver
+        
+        # Chat queries arrive pre-encoded as bytes and are never cached
+        is_text = isinstance(query, str)
+        if not is_text:
+            loading_message = "Generating response"
+        elif query == "PING":
             loading_message = "Testing connection"
         elif query == "LIST":
             loading_message = "Fetching models"
         elif len(query) > 10:
             loading_message = "Generating response"
         
-        loader = LoadingAnimation(loading_message)
+        if is_text:
+            expiry, cached = self._cache.get(query, (0.0, None))
+            if cached is not None and time.monotonic() < expiry:
+                return cached
+        
+        loader = LoadingAnimation(loading_message, self.spinner)
         
         try:
-            if show_query and query in ["PING", "LIST"]:
+            if show_query and is_text and query in ("PING", "LIST"):
                 self.print_info(f"Querying: {query}")
             
             loader.start()
-            response = self.resolver.resolve(query, 'TXT')
+            response = self._resolve_txt(query, use_tcp)
             loader.stop()
             
             if response:
-                txt_record = str(response[0]).strip('"')
-                return txt_record
+                return response
             else:
                 self.print_error("No response received")
                 return None
@@ -115,9 +572,9 @@ class DNSChatClient:
             loader.stop()
             self.print_error("No TXT record found")
             return None
-        except dns.resolver.Timeout:
+        except dns.exception.Timeout as e:
             loader.stop()
-            self.print_error("DNS query timed out")
+            self.print_error(str(e) if e.args else "DNS query timed out")
             return None
         except dns.exception.DNSException as e:
             loader.stop()
@@ -141,19 +598,30 @@ class DNSChatClient:
     def list_models(self) -> Optional[List[str]]:
         response = self.query_dns("LIST", show_query=False)
         
-        if response and response.startswith("Available models:"):
-            models_str = response.replace("Available models: ", "")
-            models = [model.strip() for model in models_str.split("|")]
+        if response and response.startswith(_MODELS_PREFIX):
+            models = _MODEL_SEPARATOR.split(response[_MODELS_PREFIX_LEN:].strip())
             
             self.print_success("Available models:")
-            for model in models:
-                print(f"  {Fore.YELLOW}{model}{Style.RESET_ALL}")
-            print()
+            print("".join(f"  {Fore.YELLOW}{model}{Style.RESET_ALL}\n" for model in models))
             return models
         else:
             self.print_error(f"Unexpected response: {response}")
             return None
     
+    def _chat_query(self, model_index: int, prompt: str) -> bytes:
+        # Raises ValueError so batches can report a rejected prompt in its slot
+        if not prompt.strip():
+            raise ValueError("Prompt cannot be empty")
+        
+        # Built as bytes once; _query_name slices it into labels without
+        # encoding it again.
+        query = self._api_key_prefix + b"%d" % model_index + prompt.encode("utf-8")
+        
+        if len(query) > _MAX_QUERY_BYTES:
+            header_len = len(self._api_key_prefix) + 1
+            raise ValueError(f"Prompt is too long: {len(query) - header_len} bytes, at most {_MAX_QUERY_BYTES - header_len} fit in one DNS query")
+        return query
+    
     def chat(self, model_index: int, prompt: str) -> Optional[str]:
         if not self.api_key:
             self.print_error("API key not set. Use set_api_key() first.")
@@ -163,13 +631,13 @@ class DNSChatClient:
             self.print_error("Model index must be between 0 and 9")
             return None
         
-        if not prompt.strip():
-            self.print_error("Prompt cannot be empty")
+        try:
+            query = self._chat_query(model_index, prompt)
+        except ValueError as e:
+            self.print_error(str(e))
             return None
         
-        query = f"{self.api_key}{model_index}{prompt}"
-        
-        response = self.query_dns(query, show_query=False)
+        response = self.query_dns(query, show_query=False, use_tcp=True)
         
         if response:
             if response.startswith("ERROR:"):
@@ -180,24 +648,99 @@ class DNSChatClient:
                 return response
         
         return None
+    
+    def chat_many(self, model_index: int, prompts: List[str], concurrency: int = 4) -> List[Optional[str]]:
+        import asyncio
+        import dns.exception
+        import dns.resolver
+        
+        if not self.api_key:
+            self.print_error("API key not set. Use set_api_key() first.")
+            return []
+        
+        if not (0 <= model_index <= 9):
+            self.print_error("Model index must be between 0 and 9")
+            return []
+        
+        # Rejected prompts are not sent; their error is reported in their slot
+        # below so the output stays in the order of the prompts.
+        checked: List[Union[bytes, ValueError]] = []
+        for prompt in prompts:
+            try:
+                checked.append(self._chat_query(model_index, prompt))
+            except ValueError as e:
+                checked.append(e)
+        queries = [query for query in checked if isinstance(query, bytes)]
+        
+        loader = LoadingAnimation(f"Generating {len(queries)} responses", self.spinner)
+        loader.start()
+        try:
+            results = asyncio.run(self._gather_txt(queries, concurrency)) if queries else []
+        except Exception as e:
+            # Setup failures (e.g. https without httpx) hit the whole batch
+            loader.stop()
+            self.print_error(f"Unexpected error: {e}")
+            return [None] * len(prompts)
+        loader.stop()
+        
+        results_iter = iter(results)
+        responses: List[Optional[str]] = []
+        for query in checked:
+            if isinstance(query, ValueError):
+                self.print_error(str(query))
+                responses.append(None)
+                continue
+            result = next(results_iter)
+            if isinstance(result, dns.resolver.NXDOMAIN):
+                self.print_error("Domain not found")
+            elif isinstance(result, dns.resolver.NoAnswer):
+                self.print_error("No TXT record found")
+            elif isinstance(result, dns.exception.Timeout):
+                self.print_error("DNS query timed out")
+            elif isinstance(result, dns.exception.DNSException):
+                self.print_error(f"DNS error: {result}")
+            elif isinstance(result, Exception):
+                self.print_error(f"Unexpected error: {result}")
+            elif result.startswith("ERROR:"):
+                self.print_error(result)
+            else:
+                self.print_response(result)
+                responses.append(result)
+                continue
+            responses.append(None)
+        
+        return responses
 
 
 
 @click.group()
 @click.option('--host', default='127.0.0.1', help='DNS server host')
-@click.option('--port', default=53, help='DNS server port')
+@click.option('--port', type=int, help='DNS server port (default: 53, 853 for tls, 443 for https)')
 @click.option('--api-key', help='10-character API key for authentication')
+@click.option('--timeout', default=2.0, type=float, help='Longest wait for a single DNS attempt, in seconds')
+@click.option('--lifetime', default=6.0, type=float, help='Total seconds to spend on a PING or LIST query, retries included')
+@click.option('--chat-timeout', default=10.0, type=float, help='Seconds to wait for the model to answer a chat prompt')
+@click.option('--no-spinner', is_flag=True, help='Do not animate while waiting for the server')
+@click.option('--transport', default='auto', type=click.Choice(_TRANSPORTS),
+              help='How queries reach the server: auto (UDP, chat over TCP), udp, tcp, tls (DoT) or https (DoH)')
+@click.option('--server-name', help='Name sent as TLS SNI and checked against the server certificate for tls/https; '
+              'for https also the HTTP Host. Connections still go to --host (default: --host)')
 @click.pass_context
-def cli(ctx, host, port, api_key):
+def cli(ctx, host, port, api_key, timeout, lifetime, chat_timeout, no_spinner, transport, server_name):
     ctx.ensure_object(dict)
     
-    client = DNSChatClient(host, port)
+    if port is None:
+        port = _DEFAULT_PORTS[transport]
+    
+    client = DNSChatClient(host, port, timeout, lifetime, spinner=not no_spinner,
+                           transport=transport, server_name=server_name, chat_timeout=chat_timeout)
     
     if api_key:
         client.set_api_key(api_key)
     
     ctx.obj['client'] = client
     ctx.obj['api_key'] = api_key
+    ctx.call_on_close(client.close)
 
 @cli.command()
 @click.pass_context
@@ -212,24 +755,55 @@ def list(ctx):
     client.list_models()
 
 @cli.command()
+@click.option('--model', 'model_index', default=0, type=click.IntRange(0, 9), help='Model index to chat with')
+@click.option('--concurrency', default=4, type=click.IntRange(min=1), help='Number of prompts in flight at once')
 @click.pass_context
-def interactive(ctx):
+def batch(ctx, model_index, concurrency):
     client = ctx.obj['client']
     
     if not client.api_key:
         client.print_error("API key required for chat. Use --api-key option")
         return
     
-    print(f"{Fore.MAGENTA}{'='*60}{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}🚀 DNS-based LLM Chat - Interactive Mode{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}{'='*60}{Style.RESET_ALL}")
-    print()
+    prompts = [line.strip() for line in sys.stdin if line.strip()]
+    if not prompts:
+        client.print_warning("No prompts read from stdin")
+        return
     
-    if not client.ping():
-        client.print_error("Cannot connect to server. Exiting.")
+    client.chat_many(model_index, prompts, concurrency)
+
+@cli.command()
+@click.option('--ping/--no-ping', 'check_connection', default=None,
+              help='Ping the server before listing models (default: only for non-local hosts)')
+@click.pass_context
+def interactive(ctx, check_connection):
+    from prompt_toolkit import prompt
+    from prompt_toolkit.history import InMemoryHistory
+    from prompt_toolkit.styles import Style as PromptStyle
+    
+    client = ctx.obj['client']
+    
+    if not client.api_key:
+        client.print_error("API key required for chat. Use --api-key option")
         return
     
-    print()
+    print(
+        f"{Fore.MAGENTA}{'='*60}{Style.RESET_ALL}\n"
+        f"{Fore.MAGENTA}🚀 DNS-based LLM Chat - Interactive Mode{Style.RESET_ALL}\n"
+        f"{Fore.MAGENTA}{'='*60}{Style.RESET_ALL}\n"
+    )
+    
+    # On a loopback server the LIST query below fails just as fast as a PING
+    # would, so the extra round-trip only buys a nicer error message.
+    if check_connection is None:
+        check_connection = client.server_host not in _LOOPBACK_HOSTS
+    
+    if check_connection:
+        if not client.ping():
+            client.print_error("Cannot connect to server. Exiting.")
+            return
+        print()
+    
     models = client.list_models()
     if not models:
         client.print_error("Cannot fetch models. Exiting.")
@@ -267,7 +841,8 @@ def interactive(ctx):
                 complete_style='column'
             )
             
-            if user_input.lower() in ['quit', 'exit', 'bye', 'q']:
+            # Only short inputs can be an exit command; skip lowercasing long prompts
+            if len(user_input) <= 4 and user_input.lower() in _EXIT:
                 print(f"{Fore.YELLOW}Goodbye!{Style.RESET_ALL}")
                 break
             
@@ -60,6 +60,9 @@ setup(
     ],
     python_requires=">=3.8",
     install_requires=requirements,
+    extras_require={
+        "https": ["httpx[http2]"],
+    },
     entry_points={
         "console_scripts": [
             "gpt53=dns_chat:cli",